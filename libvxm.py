@@ -11,18 +11,37 @@ Updates:
 - position() uses a short line read to avoid hangs.
 """
 
-import time, re
+import math, os, selectors, statistics, sys, threading, time, re
+from contextlib import contextmanager
 from typing import Optional
 
 try:
     import serial
-    from serial.tools import list_ports
 except Exception as e:
     raise RuntimeError("pyserial is required. Install with: pip install pyserial") from e
 
+_list_ports = None  # serial.tools.list_ports, imported on first enumeration
+
+
+_CR = b"\r"
+_POS_RE = re.compile(rb'[-+]?\d+')
+# translate() table dropping everything but '+', '-' and digits
+_DROP = bytes(b for b in range(256) if not (b == 0x2b or b == 0x2d or 0x30 <= b <= 0x39))
+_AXIS_CMD = (b"X\r", b"Y\r", b"Z\r", b"T\r")
+_PRECOMPILED = {"R": b"R\r", "D": b"D\r", "K": b"K\r", "C": b"C\r"}
+_SPEED = (b"S1M", b"S2M", b"S3M", b"S4M")
+_ACCEL = (b"A1M", b"A2M", b"A3M", b"A4M")
+_MOVE  = (b"I1M", b"I2M", b"I3M", b"I4M")
+
 
 class VXM:
-    def __init__(self, port: str, baudrate: int = 9600, timeout: float = 0.2):
+    SEND_WAIT_S = 0.03   # max wait for a reply to start after a write
+    SEND_TAIL_S = 0.002  # silence window that ends a reply once bytes arrived
+
+    # 20 ms default: long enough for a byte gap at 9600 baud, short enough
+    # that a silence-window check never idles for 200 ms.
+    def __init__(self, port: str, baudrate: int = 9600, timeout: float = 0.02,
+                 latency_timer: int = 1):
         self.ser = serial.Serial(
             port=port,
             baudrate=baudrate,
@@ -35,80 +54,367 @@ class VXM:
             rtscts=False,
             dsrdtr=False,
         )
+        self._pending: Optional[list] = None  # command buffer while in batch()
+        self._rx = bytearray()                # rolling buffer of unread RX bytes
+        self._hist: dict = {}                 # (motor, |steps|) -> recent blocking-run durations
+        self._last_move: Optional[tuple] = None
+        self._moving = False                  # non-blocking motion outstanding
+        self.ready_mode = "char"              # "char": stop on ready_char; "silence": quiet window
+        self.ready_char = "^"
+        self.quiet_ms = 150
+        try:
+            self._fd = None if sys.platform.startswith("win") else self.ser.fileno()
+        except Exception:
+            self._fd = None
+        self._sel = None
+        if self._fd is not None:
+            # epoll/kqueue wakeup the instant a byte arrives; registered once
+            self._sel = selectors.DefaultSelector()
+            self._sel.register(self._fd, selectors.EVENT_READ)
+        self._timeout_warned = False
+        self._rx_cond = threading.Condition()
+        self._rx_stop = threading.Event()
+        self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
+        self._rx_thread.start()
+        if latency_timer:
+            self._set_latency_timer(latency_timer)
         self.send("F", wait=False)        # On-Line mode
         self.steps_per_mm: Optional[float] = None
 
-    def close(self): 
+    def close(self):
+        self._rx_stop.set()
+        t = getattr(self, "_rx_thread", None)
+        if t is not None and t.is_alive():
+            t.join(timeout=1.0)
+        if self._sel is not None:
+            try: self._sel.close()
+            except: pass
+            self._sel = None
         try: self.ser.close()
         except: pass
 
     def __enter__(self): return self
     def __exit__(self, a,b,c): self.close()
 
+    @property
+    def read_timeout(self) -> float:
+        """Port read timeout. Only the non-POSIX fallback reader consults it;
+        the selector-based reader wakes on data and ignores port timeouts."""
+        return self.ser.timeout
+    @read_timeout.setter
+    def read_timeout(self, s: float):
+        self.ser.timeout = float(s)
+        self._timeout_hint()
+
+    @property
+    def write_timeout(self) -> float:
+        """Port write timeout. Ignored on POSIX, where writes go through
+        os.write (see _write_raw)."""
+        return self.ser.write_timeout
+    @write_timeout.setter
+    def write_timeout(self, s: float):
+        self.ser.write_timeout = float(s)
+        self._timeout_hint()
+
+    def _timeout_hint(self):
+        if self._sel is None or self._timeout_warned:
+            return
+        self._timeout_warned = True
+        print("Note: the event-driven reader ignores port timeouts on this "
+              "platform; read/write_timeout only affect the non-POSIX fallback. "
+              "Pass explicit timeouts to wait_ready()/position_raw() instead.",
+              file=sys.stderr)
+
+    def _set_latency_timer(self, ms: int):
+        """Shrink the FTDI driver's buffering timer (default 16 ms) on Linux.
+
+        That timer is usually the dominant per-read delay at 9600 baud;
+        1 ms cuts every position()/wait round-trip by 10-16x.
+        """
+        if sys.platform.startswith("win"):
+            print("Hint: set 'Latency Timer' to 1 ms in the FTDI driver control panel "
+                  "for faster responses.", file=sys.stderr)
+            return
+        dev = os.path.basename(self.ser.name or "")
+        path = f"/sys/bus/usb-serial/devices/{dev}/latency_timer"
+        try:
+            with open(path, "w") as f:
+                f.write(str(int(ms)))
+        except Exception:
+            pass  # non-FTDI adapter or no permission; harmless either way
+
     # -------- Helpers --------
-    def _read_line(self, timeout: float = 1.0) -> str:
-        end = time.time() + timeout
-        buf = ""
-        while time.time() < end:
-            b = self.ser.read(1)
-            if not b: continue
-            ch = b.decode(errors="ignore")
-            if ch in ("\r","\n"):
-                self.ser.read(self.ser.in_waiting or 0)
-                return buf.strip()
-            buf += ch
-        return buf.strip()
-
-    def _wait_ready_silence(self, quiet_ms: int = 150, timeout: float = 60.0) -> str:
-        end = time.time() + timeout
-        buf = ""
-        last_rx = time.time()
-        while time.time() < end:
-            chunk = self.ser.read(self.ser.in_waiting or 1).decode(errors="ignore")
-            if chunk:
-                buf += chunk
-                last_rx = time.time()
+    RX_MAX = 65536  # rolling-buffer bound; oldest bytes are dropped past this
+
+    def _rx_loop(self):
+        """Reader thread: the only consumer of the port. Continuously drains
+        RX into self._rx and wakes waiters through the condition."""
+        if self._sel is None:
+            # one reconfigure up front instead of a save/set/restore (two
+            # tcsetattr-equivalents) around every read in the fallback path
+            try: self.ser.timeout = 0.05
+            except Exception: pass
+        while not self._rx_stop.is_set():
+            try:
+                data = self._read_wait(0.05) if self._sel is not None else self.ser.read(4096)
+            except (OSError, ValueError):
+                break  # port closed under us
+            if data:
+                with self._rx_cond:
+                    self._rx += data
+                    if len(self._rx) > self.RX_MAX:
+                        del self._rx[:-self.RX_MAX]
+                    self._note_rx(data)
+                    self._rx_cond.notify_all()
+
+    def _rx_clear(self):
+        with self._rx_cond:
+            del self._rx[:]
+
+    def _note_rx(self, data: bytes):
+        if b"^" in data: self._moving = False  # controller emitted its ready prompt
+
+    def _write_raw(self, data: bytes):
+        """os.write straight to the fd on POSIX — pyserial's write wrapper
+        costs a dozen Python frames per call; ser.write elsewhere."""
+        if self._fd is None:
+            self.ser.write(data)
+            return
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self._fd, view):]
+            except BlockingIOError:
+                time.sleep(0.001)  # tty TX buffer full; near-impossible for short commands
+
+    def _read_wait(self, max_wait: float) -> bytes:
+        """Block up to max_wait for RX bytes: selector wakeup + one os.read.
+        POSIX only — the fallback reader calls the timed ser.read directly."""
+        return os.read(self._fd, 4096) if self._sel.select(max_wait) else b""
+
+    def _read_line_bytes(self, timeout: float = 1.0) -> bytes:
+        with self._rx_cond:
+            self._rx_cond.wait_for(lambda: re.search(rb"[\r\n]", self._rx), timeout)
+            m = re.search(rb"[\r\n]", self._rx)
+            if m:
+                line = bytes(self._rx[:m.start()]).strip()
+                del self._rx[:m.end()]
+                while self._rx[:1] in (b"\r", b"\n"):
+                    del self._rx[:1]
             else:
-                if (time.time() - last_rx) * 1000.0 >= quiet_ms:
-                    return buf.strip()
-                time.sleep(0.01)
-        return buf.strip()
-
-    def send(self, cmd: str, wait: bool = True) -> str:
-        self.ser.reset_input_buffer()
-        self.ser.write((cmd + "\r").encode("ascii", errors="ignore"))
+                line = bytes(self._rx).strip()
+                del self._rx[:]
+            return line
+
+    def _read_line(self, timeout: float = 1.0) -> str:
+        return self._read_line_bytes(timeout).decode(errors="ignore").strip()
+
+    def wait_ready(self, timeout: float = 60.0, quiet_ms: Optional[int] = None) -> str:
+        """Wait for command completion.
+
+        In "char" mode (default) this returns as soon as the controller's
+        ready prompt shows up; "silence" mode keeps the old behavior of
+        waiting quiet_ms with no traffic. Blocks in the OS either way.
+        """
+        end = time.monotonic() + timeout
+        quiet = self.quiet_ms if quiet_ms is None else quiet_ms
+        char = self.ready_char.encode() if self.ready_mode == "char" else None
+        try:
+            with self._rx_cond:
+                if char:
+                    scanned = 0
+                    def _prompt_seen():
+                        nonlocal scanned
+                        if len(self._rx) < scanned: scanned = 0  # buffer was trimmed
+                        i = self._rx.find(char, scanned)
+                        scanned = len(self._rx)
+                        return i >= 0
+                    self._rx_cond.wait_for(_prompt_seen, timeout)
+                else:
+                    last_rx = time.monotonic()
+                    while True:
+                        rem = end - time.monotonic()
+                        if rem <= 0: break
+                        n = len(self._rx)
+                        self._rx_cond.wait(min(quiet / 1000.0, rem))
+                        if len(self._rx) != n:
+                            last_rx = time.monotonic()
+                        elif (time.monotonic() - last_rx) * 1000.0 >= quiet:
+                            break
+                buf = bytes(self._rx)
+                del self._rx[:]
+            if char:
+                i = buf.rfind(char)
+                if i >= 0: buf = buf[:i]
+            return buf.decode(errors="ignore").strip()
+        finally:
+            self._moving = False
+
+    def read_raw(self, timeout: float = 0.5) -> bytes:
+        """Consume whatever RX bytes arrive within timeout (monitor/debug)."""
+        with self._rx_cond:
+            if not self._rx:
+                self._rx_cond.wait(timeout)
+            out = bytes(self._rx)
+            del self._rx[:]
+            return out
+
+    def send(self, cmd: str, wait: bool = True, block_until_ready: bool = False,
+             timeout: float = 60.0) -> str:
+        if self._pending is not None:
+            self._pending.append(cmd)
+            return ""
+        # VXM commands are ASCII by construction; a non-ASCII cmd is caller
+        # error and raises rather than being silently mangled.
+        return self._send_bytes(cmd.encode("ascii") + _CR,
+                                wait=wait, block_until_ready=block_until_ready,
+                                timeout=timeout)
+
+    def _send_bytes(self, data: bytes, wait: bool = True, block_until_ready: bool = False,
+                    timeout: float = 60.0) -> str:
+        """send() minus the str encode, for pre-encoded commands."""
+        if self._pending is not None:
+            self._pending.append(data.rstrip(b"\r").decode("ascii"))
+            return ""
+        self._rx_clear()  # user-space discard; no tcflush ioctl
+        self._write_raw(data)
+        if block_until_ready:
+            # Fused path: no echo grace, one loop scans for the ready prompt
+            # from the first byte on.
+            return self.wait_ready(timeout=timeout)
         if wait:
-            time.sleep(0.03)
-            return self.ser.read(self.ser.in_waiting or 0).decode(errors="ignore").strip()
+            # Wait up to SEND_WAIT_S for the reply to start (reader-thread
+            # wakeup, no sleep poll), then only SEND_TAIL_S for it to go quiet.
+            char = self.ready_char.encode() if self.ready_mode == "char" else None
+            with self._rx_cond:
+                if self._rx_cond.wait_for(lambda: len(self._rx) > 0, self.SEND_WAIT_S):
+                    n = -1
+                    while n != len(self._rx) and not (char and char in self._rx):
+                        n = len(self._rx)
+                        self._rx_cond.wait(self.SEND_TAIL_S)
+                buf = bytes(self._rx)
+                del self._rx[:]
+            return buf.decode(errors="ignore").strip()
+        return ""
+
+    def _write_cmd_bytes(self, data: bytes) -> str:
+        """Fire-and-forget write of a pre-encoded command (no drain, no reply wait)."""
+        if self._pending is not None:
+            self._pending.append(data.rstrip(b"\r").decode("ascii"))
+            return ""
+        self._write_raw(data)
         return ""
 
+    def send_many(self, cmds: list, block_until_ready: bool = False, timeout: float = 60.0) -> str:
+        """Pipeline independent commands as one comma-joined write (1 round-trip, not N)."""
+        payload = ",".join(cmds)
+        if block_until_ready:
+            return self.send(payload, block_until_ready=True, timeout=timeout)
+        return self.send(payload, wait=False)
+
+    def send_program(self, cmds: list, block: bool = True, timeout: float = 120.0) -> str:
+        """Join commands with ',' and write them as one line (one round-trip)."""
+        return self.send_many(cmds, block_until_ready=block, timeout=timeout)
+
+    def compile_program(self, cmds: list) -> str:
+        """Store cmds in the controller's onboard program memory.
+
+        A stored program runs at full controller speed with a single 'R',
+        so an N-command scan costs one serial upload instead of N
+        round-trips. The uploaded program stays selected so run_program's
+        'R' executes it; a store-only line emits no '^', so only the
+        short echo wait applies.
+        """
+        return self.send(",".join(["PM-1", "C", *cmds]))
+
+    def run_program(self, block: bool = True, timeout: float = 600.0) -> str:
+        """Run the stored program (see compile_program)."""
+        return self.run(block=block, timeout=timeout)
+
+    @contextmanager
+    def batch(self, block: bool = True, timeout: float = 120.0):
+        """Buffer every send() inside the with-block; flush as one program on
+        clean exit. If the block raises, the partial sequence is discarded —
+        running a truncated motion program is a hardware hazard."""
+        self._pending = []
+        try:
+            yield self
+        except BaseException:
+            self._pending = None
+            raise
+        cmds, self._pending = self._pending, None
+        if cmds:
+            self.send_program(cmds, block=block, timeout=timeout)
+
     # -------- High-level API --------
-    def set_speed(self, motor:int, speed:int): return self.send(f"S{motor}M{speed}")
-    def set_accel(self, motor:int, accel:int): return self.send(f"A{motor}M{accel}")
-    def move_relative(self, motor:int, steps:int): return self.send(f"I{motor}M{steps}")
+    def set_speed(self, motor:int, speed:int):
+        if not 1<=motor<=4: raise ValueError("motor 1..4")
+        return self._write_cmd_bytes(_SPEED[motor-1]+b"%d\r"%speed)
+    def set_accel(self, motor:int, accel:int):
+        if not 1<=motor<=4: raise ValueError("motor 1..4")
+        return self._write_cmd_bytes(_ACCEL[motor-1]+b"%d\r"%accel)
+    def move_relative(self, motor:int, steps:int):
+        if not 1<=motor<=4: raise ValueError("motor 1..4")
+        self._last_move=(motor,abs(steps))
+        return self._write_cmd_bytes(_MOVE[motor-1]+b"%d\r"%steps)
     def run(self, block: bool = True, timeout: float = 120.0) -> str:
-        self.send("R", wait=False)
-        return self._wait_ready_silence(timeout=timeout) if block else ""
+        self._send_bytes(_PRECOMPILED["R"], wait=False)
+        if self._pending is not None:
+            return ""  # buffered into batch(); nothing on the wire to wait for
+        if not block:
+            self._moving = True
+            return ""
+        t0 = time.monotonic()
+        key = self._last_move  # (motor, |steps|); durations aren't comparable across sizes
+        self._presleep(key, timeout)
+        out = self.wait_ready(timeout=timeout)
+        if key is not None:
+            durs = self._hist.setdefault(key, [])
+            durs.append(time.monotonic() - t0)
+            del durs[:-32]
+        return out
+
+    def _presleep(self, key, timeout: float):
+        """Sleep through the early never-done window before polling hard.
+
+        Uses a lognormal fit of recent blocking-run durations for this
+        (motor, |steps|) pair; without history (first few moves) polling
+        starts immediately.
+        """
+        durs = self._hist.get(key, ())
+        if len(durs) < 3: return
+        logs = [math.log(d) for d in durs if d > 0]
+        if len(logs) < 3: return
+        mu, sigma = statistics.fmean(logs), statistics.stdev(logs)
+        t = math.exp(mu - 1.28 * sigma)  # ~p10: done earlier than this 1 time in 10
+        time.sleep(min(t, timeout * 0.5))
     def stop(self, block: bool = False, timeout: float = 60.0) -> str:
-        self.send("D", wait=False)
-        return self._wait_ready_silence(timeout=timeout) if block else ""
+        self._send_bytes(_PRECOMPILED["D"], wait=False)
+        return self.wait_ready(timeout=timeout) if block and self._pending is None else ""
     def kill(self, block: bool = False, timeout: float = 60.0) -> str:
-        self.send("K", wait=False)
-        return self._wait_ready_silence(timeout=timeout) if block else ""
+        self._send_bytes(_PRECOMPILED["K"], wait=False)
+        return self.wait_ready(timeout=timeout) if block and self._pending is None else ""
     def clear(self, block: bool = False, timeout: float = 10.0) -> str:
-        self.send("C", wait=False)
-        return self._wait_ready_silence(timeout=timeout) if block else ""
+        self._send_bytes(_PRECOMPILED["C"], wait=False)
+        return self.wait_ready(timeout=timeout) if block and self._pending is None else ""
+
+    def position_raw_bytes(self, motor:int, line_timeout:float=1.0)->bytes:
+        if not 1 <= motor <= 4: raise ValueError("motor 1..4")
+        self._rx_clear()
+        self._write_raw(_AXIS_CMD[motor-1])
+        return self._read_line_bytes(timeout=line_timeout)
 
     def position_raw(self, motor:int, line_timeout:float=1.0)->str:
-        axis = {1:"X",2:"Y",3:"Z",4:"T"}.get(motor)
-        if not axis: raise ValueError("motor 1..4")
-        self.ser.reset_input_buffer()
-        self.ser.write((axis+"\r").encode("ascii"))
-        return self._read_line(timeout=line_timeout)
+        return self.position_raw_bytes(motor,line_timeout).decode(errors="ignore").strip()
 
     def position_value(self, motor:int, line_timeout:float=1.0)->Optional[int]:
-        raw=self.position_raw(motor,line_timeout)
-        m=re.search(r'[-+]?\d+', raw)
+        raw_b=self.position_raw_bytes(motor,line_timeout)
+        # branchless fast path: strip everything but sign/digit bytes in C
+        cleaned=raw_b.translate(None,_DROP)
+        if cleaned and cleaned not in (b"+",b"-"):
+            try: return int(cleaned)
+            except ValueError: pass  # stray sign mid-string; regex below
+        m=_POS_RE.search(raw_b)
         return int(m.group(0)) if m else None
 
     def set_scale(self, steps_per_mm:float): self.steps_per_mm=float(steps_per_mm)
@@ -117,22 +423,64 @@ class VXM:
         return int(round(mm*self.steps_per_mm))
     def move_mm(self, motor:int, mm:float): return self.move_relative(motor, self.mm_to_steps(mm))
 
-    def home(self, motor:int, direction:str="neg", speed:int=500, backoff_steps:int=200):
-        self.set_speed(motor,speed)
-        self.send(f"I{motor}M-0" if direction=="neg" else f"I{motor}M0", wait=False)
-        self.run(block=True)
+    def move_mm_many(self, motor:int, mms, block: bool = True, timeout: float = 600.0) -> str:
+        """Convert a waypoint list to steps and run it as one compound program.
+
+        Uses numpy for the mm->steps conversion when available (one C-level
+        multiply for N waypoints); either way the result is a single serial
+        transaction instead of N move/run round-trips.
+        """
+        if self.steps_per_mm is None: raise RuntimeError("Scale not set")
+        if not 1<=motor<=4: raise ValueError("motor 1..4")
+        try:
+            import numpy as np
+            steps = np.rint(np.asarray(mms, dtype=np.float64) * self.steps_per_mm).astype(np.int64)
+        except ImportError:
+            steps = [int(round(mm * self.steps_per_mm)) for mm in mms]
+        cmds = [f"I{motor}M{int(s)}" for s in steps]
+        cmds.append("R")
+        return self.send_many(cmds, block_until_ready=block, timeout=timeout)
+
+    def home(self, motor:int, direction:str="neg", speed:int=500, backoff_steps:int=200,
+             timeout: float = 120.0):
+        if direction not in ("neg","pos"): raise ValueError("direction neg|pos")
         steps=abs(backoff_steps)
-        self.move_relative(motor, steps if direction=="neg" else -steps)
-        self.run(block=True)
-        self.send(f"IA{motor}M-0")
+        # One cleared program, one R, one handshake: C empties the program
+        # buffer, the queued moves run back to back on the controller.
+        cmd=(f"C,S{motor}M{speed},"
+             f"I{motor}M{'-0' if direction=='neg' else '0'},"
+             f"I{motor}M{steps if direction=='neg' else -steps},"
+             f"IA{motor}M-0,R")
+        return self.send(cmd, block_until_ready=True, timeout=timeout)
 
     def is_busy(self, motor:int=1, interval:float=0.2)->bool:
+        if self._moving:
+            # A non-blocking run is outstanding: just wait for the reader
+            # thread to spot the '^' prompt instead of two position round-trips.
+            with self._rx_cond:
+                return not self._rx_cond.wait_for(lambda: not self._moving, interval)
+        # Nothing tracked as moving (e.g. raw 'R' via send): position diff.
         p1=self.position_value(motor) or 0
         time.sleep(interval)
         p2=self.position_value(motor) or 0
         return p1!=p2
 
 
-def list_serial_ports():
-    try: return [p.device for p in list_ports.comports()]
-    except: return []
+_PORTS_CACHE = (0.0, [])
+_PORTS_TTL_S = 2.0
+
+def list_serial_ports(force: bool = False):
+    # comports() walks /sys (or the Setup API) with many syscalls; cache it
+    # briefly for back-to-back calls like '--list' then connect.
+    global _PORTS_CACHE, _list_ports
+    ts, ports = _PORTS_CACHE
+    if not force and time.monotonic() - ts < _PORTS_TTL_S:
+        return ports
+    if _list_ports is None:
+        # deferred: serial.tools pulls in platform backends (IOKit/setupapi)
+        # that the common --port path never needs
+        from serial.tools import list_ports as _list_ports
+    try: ports = [p.device for p in _list_ports.comports()]
+    except: ports = []
+    _PORTS_CACHE = (time.monotonic(), ports)
+    return ports
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+vxm_async.py — asyncio API for Velmex VXM controllers.
+
+AsyncVXM mirrors libvxm.VXM as async def methods on top of a
+pyserial-asyncio transport/protocol pair, so waiting on motion (run,
+home, position) suspends only the current task: several controllers, or
+acquisition running alongside motion, share one thread with no GIL
+contention. The protocol sets an asyncio.Event the moment the '^' ready
+prompt arrives, so wait_ready is a pure event wait with no polling.
+"""
+
+import asyncio, re
+from typing import Optional
+
+try:
+    import serial_asyncio
+except Exception as e:
+    raise RuntimeError("pyserial-asyncio is required. Install with: pip install pyserial-asyncio") from e
+
+READY_CHAR = b"^"
+_LINE_RE = re.compile(rb"[\r\n]")
+
+
+class VXMProtocol(asyncio.Protocol):
+    def __init__(self):
+        self.transport = None
+        self._buf = bytearray()
+        self._data = asyncio.Event()   # any bytes arrived
+        self._ready = asyncio.Event()  # '^' arrived
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._buf += data
+        self._data.set()
+        if READY_CHAR in data:
+            self._ready.set()
+
+    def take(self) -> bytes:
+        """Snapshot and clear the RX buffer and the data event.
+
+        _ready persists: a '^' consumed here (e.g. by a position poll
+        racing a run) must still satisfy a later wait_ready. Only the
+        waiter that actually handles readiness clears it.
+        """
+        out = bytes(self._buf)
+        del self._buf[:]
+        self._data.clear()
+        return out
+
+
+class AsyncVXM:
+    def __init__(self, transport, protocol: VXMProtocol):
+        self.transport, self.protocol = transport, protocol
+        # serializes round-trips: concurrent tasks sharing one AsyncVXM
+        # would otherwise interleave on the single RX buffer
+        self._lock = asyncio.Lock()
+        self.steps_per_mm: Optional[float] = None
+
+    @classmethod
+    async def open(cls, port: str, baudrate: int = 9600) -> "AsyncVXM":
+        loop = asyncio.get_running_loop()
+        transport, protocol = await serial_asyncio.create_serial_connection(
+            loop, VXMProtocol, port, baudrate=baudrate)
+        vxm = cls(transport, protocol)
+        await vxm.send("F", wait=False)   # On-Line mode
+        return vxm
+
+    async def close(self):
+        try: self.transport.close()
+        except: pass
+
+    async def __aenter__(self): return self
+    async def __aexit__(self, a,b,c): await self.close()
+
+    # -------- Helpers --------
+    async def send(self, cmd: str, wait: bool = True, timeout: float = 0.03) -> str:
+        async with self._lock:
+            p = self.protocol
+            p.take()
+            p._ready.clear()  # a new command is in flight; stale '^' is spent
+            self.transport.write((cmd + "\r").encode("ascii", errors="ignore"))
+            if wait:
+                try:
+                    await asyncio.wait_for(p._data.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                return p.take().decode(errors="ignore").strip()
+            return ""
+
+    async def wait_ready(self, timeout: float = 120.0) -> str:
+        """Suspend until the controller emits its '^' ready prompt."""
+        p = self.protocol
+        try:
+            await asyncio.wait_for(p._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        async with self._lock:
+            p._ready.clear()
+            text = p.take().decode(errors="ignore")
+        i = text.rfind(READY_CHAR.decode())
+        return (text[:i] if i >= 0 else text).strip()
+
+    async def _read_line(self, timeout: float = 1.0) -> str:
+        p = self.protocol
+        loop = asyncio.get_running_loop()
+        end = loop.time() + timeout
+        while True:
+            p._data.clear()
+            m = _LINE_RE.search(p._buf)
+            if m:
+                line = p._buf[:m.start()].decode(errors="ignore").strip()
+                p.take()
+                return line
+            rem = end - loop.time()
+            if rem <= 0:
+                return p.take().decode(errors="ignore").strip()
+            try:
+                await asyncio.wait_for(p._data.wait(), rem)
+            except asyncio.TimeoutError:
+                pass
+
+    # -------- High-level API --------
+    async def set_speed(self, motor:int, speed:int): return await self.send(f"S{motor}M{speed}")
+    async def set_accel(self, motor:int, accel:int): return await self.send(f"A{motor}M{accel}")
+    async def move_relative(self, motor:int, steps:int): return await self.send(f"I{motor}M{steps}")
+
+    async def run(self, block: bool = True, timeout: float = 120.0) -> str:
+        await self.send("R", wait=False)
+        return await self.wait_ready(timeout) if block else ""
+
+    async def stop(self, block: bool = False, timeout: float = 60.0) -> str:
+        await self.send("D", wait=False)
+        return await self.wait_ready(timeout) if block else ""
+
+    async def kill(self, block: bool = False, timeout: float = 60.0) -> str:
+        await self.send("K", wait=False)
+        return await self.wait_ready(timeout) if block else ""
+
+    async def clear(self, block: bool = False, timeout: float = 10.0) -> str:
+        await self.send("C", wait=False)
+        return await self.wait_ready(timeout) if block else ""
+
+    async def position_raw(self, motor:int, line_timeout:float=1.0)->str:
+        axis = {1:"X",2:"Y",3:"Z",4:"T"}.get(motor)
+        if not axis: raise ValueError("motor 1..4")
+        async with self._lock:
+            self.protocol.take()
+            self.transport.write((axis+"\r").encode("ascii"))
+            return await self._read_line(line_timeout)
+
+    async def position_value(self, motor:int, line_timeout:float=1.0)->Optional[int]:
+        raw = await self.position_raw(motor,line_timeout)
+        m=re.search(r'[-+]?\d+', raw)
+        return int(m.group(0)) if m else None
+
+    def set_scale(self, steps_per_mm:float): self.steps_per_mm=float(steps_per_mm)
+    def mm_to_steps(self, mm:float)->int:
+        if self.steps_per_mm is None: raise RuntimeError("Scale not set")
+        return int(round(mm*self.steps_per_mm))
+    async def move_mm(self, motor:int, mm:float): return await self.move_relative(motor, self.mm_to_steps(mm))
+
+    async def home(self, motor:int, direction:str="neg", speed:int=500, backoff_steps:int=200,
+                   timeout: float = 120.0):
+        if direction not in ("neg","pos"): raise ValueError("direction neg|pos")
+        steps=abs(backoff_steps)
+        cmd=(f"C,S{motor}M{speed},"
+             f"I{motor}M{'-0' if direction=='neg' else '0'},"
+             f"I{motor}M{steps if direction=='neg' else -steps},"
+             f"IA{motor}M-0,R")
+        await self.send(cmd, wait=False)
+        return await self.wait_ready(timeout)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+vxm_mp.py — process-backed serial transport for Velmex VXM controllers.
+
+A _SerialWorker process owns serial.Serial and shuttles bytes over two
+queues, so port reads are never delayed by the GIL in the main process
+(REPL, camera capture, etc.). VXMProc mirrors the blocking libvxm.VXM
+API on top of the queues; use it as a drop-in when instrumentation runs
+alongside motion.
+"""
+
+import multiprocessing, queue, select, sys, time, re
+from typing import Optional
+
+
+class _SerialWorker(multiprocessing.Process):
+    """Owns the serial port; writes commands from in_q, pushes RX bytes to out_q."""
+
+    def __init__(self, port: str, baudrate: int, in_q, out_q, stop_ev):
+        super().__init__(daemon=True)
+        self._port, self._baud = port, baudrate
+        self._in_q, self._out_q, self._stop = in_q, out_q, stop_ev
+
+    def run(self):
+        import serial
+        try:
+            ser = serial.Serial(port=self._port, baudrate=self._baud,
+                                bytesize=serial.EIGHTBITS, parity=serial.PARITY_NONE,
+                                stopbits=serial.STOPBITS_ONE, timeout=0)
+        except Exception as e:
+            # surfaced by __init__ in the parent; a bare child traceback
+            # would leave the constructor "succeeding" on a dead port
+            self._out_q.put(("open-error", f"{type(e).__name__}: {e}"))
+            return
+        self._out_q.put(("open-ok", None))
+        poll = sys.platform != "win32"
+        try:
+            while not self._stop.is_set():
+                try:
+                    ser.write(self._in_q.get_nowait())
+                except queue.Empty:
+                    pass
+                if poll:
+                    r, _, _ = select.select([ser], [], [], 0.01)
+                    # select said readable: one non-blocking read, no in_waiting ioctl
+                    data = ser.read(4096) if r else b""
+                else:
+                    time.sleep(0.01)
+                    data = ser.read(4096)  # timeout=0: returns whatever is available
+                if data:
+                    self._out_q.put(data)
+        finally:
+            ser.close()
+
+
+class VXMProc:
+    def __init__(self, port: str, baudrate: int = 9600):
+        self._in_q = multiprocessing.Queue()
+        self._out_q = multiprocessing.Queue()
+        self._stop = multiprocessing.Event()
+        self._rx = bytearray()
+        self._worker = _SerialWorker(port, baudrate, self._in_q, self._out_q, self._stop)
+        self._worker.start()
+        try:
+            status, detail = self._out_q.get(timeout=5.0)
+        except queue.Empty:
+            self._stop.set()
+            raise RuntimeError(f"serial worker did not start for {port}")
+        if status != "open-ok":
+            self._worker.join(timeout=1.0)
+            raise RuntimeError(f"could not open {port}: {detail}")
+        self.send("F", wait=False)        # On-Line mode
+        self.steps_per_mm: Optional[float] = None
+
+    def close(self):
+        self._stop.set()
+        self._worker.join(timeout=2.0)
+
+    def __enter__(self): return self
+    def __exit__(self, a,b,c): self.close()
+
+    # -------- Helpers --------
+    def _pump(self, timeout: float = 0.0) -> bytes:
+        """Move anything the worker produced into self._rx; optionally wait for it."""
+        got = b""
+        while True:
+            try: data = self._out_q.get_nowait()
+            except queue.Empty: break
+            self._rx += data; got += data
+        if not got and timeout > 0:
+            try: data = self._out_q.get(timeout=timeout)
+            except queue.Empty: return got
+            self._rx += data; got += data
+            while True:
+                try: data = self._out_q.get_nowait()
+                except queue.Empty: break
+                self._rx += data; got += data
+        return got
+
+    def send(self, cmd: str, wait: bool = True) -> str:
+        self._pump()
+        del self._rx[:]
+        self._in_q.put((cmd + "\r").encode("ascii", errors="ignore"))
+        if wait:
+            self._pump(timeout=0.03)
+            out = self._rx.decode(errors="ignore").strip()
+            del self._rx[:]
+            return out
+        return ""
+
+    def _wait_ready_silence(self, quiet_ms: int = 150, timeout: float = 60.0) -> str:
+        end = time.monotonic() + timeout
+        last_rx = time.monotonic()
+        while time.monotonic() < end:
+            if self._pump(timeout=quiet_ms / 1000.0):
+                last_rx = time.monotonic()
+            elif (time.monotonic() - last_rx) * 1000.0 >= quiet_ms:
+                break
+        out = self._rx.decode(errors="ignore").strip()
+        del self._rx[:]
+        return out
+
+    # -------- High-level API (mirrors libvxm.VXM) --------
+    def set_speed(self, motor:int, speed:int): return self.send(f"S{motor}M{speed}")
+    def set_accel(self, motor:int, accel:int): return self.send(f"A{motor}M{accel}")
+    def move_relative(self, motor:int, steps:int): return self.send(f"I{motor}M{steps}")
+    def run(self, block: bool = True, timeout: float = 120.0) -> str:
+        self.send("R", wait=False)
+        return self._wait_ready_silence(timeout=timeout) if block else ""
+    def stop(self, block: bool = False, timeout: float = 60.0) -> str:
+        self.send("D", wait=False)
+        return self._wait_ready_silence(timeout=timeout) if block else ""
+    def kill(self, block: bool = False, timeout: float = 60.0) -> str:
+        self.send("K", wait=False)
+        return self._wait_ready_silence(timeout=timeout) if block else ""
+
+    def position_raw(self, motor:int, line_timeout:float=1.0)->str:
+        axis = {1:"X",2:"Y",3:"Z",4:"T"}.get(motor)
+        if not axis: raise ValueError("motor 1..4")
+        self._pump(); del self._rx[:]
+        self._in_q.put((axis+"\r").encode("ascii"))
+        end = time.monotonic() + line_timeout
+        while time.monotonic() < end:
+            self._pump(timeout=end - time.monotonic())
+            m = re.search(rb"[\r\n]", self._rx)
+            if m:
+                line = self._rx[:m.start()].decode(errors="ignore").strip()
+                del self._rx[:]
+                return line
+        line = self._rx.decode(errors="ignore").strip()
+        del self._rx[:]
+        return line
+
+    def position_value(self, motor:int, line_timeout:float=1.0)->Optional[int]:
+        raw=self.position_raw(motor,line_timeout)
+        m=re.search(r'[-+]?\d+', raw)
+        return int(m.group(0)) if m else None
+
+    def clear(self, block: bool = False, timeout: float = 10.0) -> str:
+        self.send("C", wait=False)
+        return self._wait_ready_silence(timeout=timeout) if block else ""
+
+    def set_scale(self, steps_per_mm:float): self.steps_per_mm=float(steps_per_mm)
+    def mm_to_steps(self, mm:float)->int:
+        if self.steps_per_mm is None: raise RuntimeError("Scale not set")
+        return int(round(mm*self.steps_per_mm))
+    def move_mm(self, motor:int, mm:float): return self.move_relative(motor, self.mm_to_steps(mm))
+
+    def home(self, motor:int, direction:str="neg", speed:int=500, backoff_steps:int=200,
+             timeout: float = 120.0):
+        if direction not in ("neg","pos"): raise ValueError("direction neg|pos")
+        steps=abs(backoff_steps)
+        cmd=(f"C,S{motor}M{speed},"
+             f"I{motor}M{'-0' if direction=='neg' else '0'},"
+             f"I{motor}M{steps if direction=='neg' else -steps},"
+             f"IA{motor}M-0,R")
+        self.send(cmd, wait=False)
+        return self._wait_ready_silence(timeout=timeout)
+
+    def is_busy(self, motor:int=1, interval:float=0.2)->bool:
+        p1=self.position_value(motor) or 0
+        time.sleep(interval)
+        p2=self.position_value(motor) or 0
+        return p1!=p2
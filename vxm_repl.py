@@ -5,9 +5,17 @@
 vxm_repl.py — CLI REPL for libvxm.VXM (non-blocking stop by default).
 """
 
-import argparse,sys,shlex,time
+import argparse,re,sys,shlex,time
 from libvxm import VXM,list_serial_ports
 
+_INT_RE=re.compile(r'[-+]?\d+$')
+
+try:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.completion import WordCompleter
+except Exception:
+    PromptSession = None  # plain input() fallback
+
 PROMPT="VXM> "
 
 HELP = """\
@@ -15,6 +23,7 @@ Commands:
   help
   ports
   send <raw>
+  batch <raw>; <raw>; ...          # pipeline raw commands in one write
   speed <m> <sps>
   accel <m> <val>
   move <m> <steps>
@@ -26,71 +35,159 @@ Commands:
   pos [m]
   isbusy [m] [interval]
   scale <steps_per_mm>
+  timeout <s> [write_s]
+  monitor [seconds]                # print raw traffic (Ctrl-C to stop early)
+  program <file>                   # upload a command file to controller memory
+  runprog [noblock] [timeout]      # run the stored program
   home <m> [neg|pos] [speed] [backoff]
   status
   sleep <s>
   quit/exit
 """
 
+# -------- Command handlers (dispatched via COMMANDS) --------
+def _noblock_flag(args): return len(args)>1 and args[1].lower() in ("noblock","nb","no")
+def _block_flag(args): return len(args)>1 and args[1].lower() in ("block","b","yes","y","true","1")
+
+def _cmd_help(vxm,args): print(HELP)
+
+def _cmd_ports(vxm,args):
+    for p in list_serial_ports(): print(p)
+
+def _cmd_send(vxm,args): print(vxm.send(" ".join(args[1:])))
+
+def _cmd_batch(vxm,args):
+    cmds=[c.strip() for c in " ".join(args[1:]).split(";") if c.strip()]
+    # only an R at the end elicits '^'; a setup-only batch would block 60 s
+    block=bool(cmds) and cmds[-1].upper()=="R"
+    print(vxm.send_many(cmds, block_until_ready=block))
+
+def _ints(*toks):
+    # regex fast-reject gives a clean message on typos instead of int()'s
+    # traceback text, and map unpacks both args in one go on the hot path
+    for t in toks:
+        if not _INT_RE.match(t): raise ValueError(f"expected integer, got {t!r}")
+    return map(int,toks)
+
+def _cmd_speed(vxm,args): m,v=_ints(*args[1:3]); print(vxm.set_speed(m,v))
+def _cmd_accel(vxm,args): m,v=_ints(*args[1:3]); print(vxm.set_accel(m,v))
+def _cmd_move(vxm,args): m,s=_ints(*args[1:3]); print(vxm.move_relative(m,s))
+def _cmd_move_mm(vxm,args): print(vxm.move_mm(int(args[1]),float(args[2])))
+
+def _cmd_run(vxm,args):
+    timeout=float(args[2]) if len(args)>2 else 120.0
+    print(vxm.run(block=not _noblock_flag(args), timeout=timeout))
+
+def _cmd_stop(vxm,args):
+    timeout=float(args[2]) if len(args)>2 else 60.0
+    print(vxm.stop(block=_block_flag(args), timeout=timeout))
+
+def _cmd_kill(vxm,args):
+    timeout=float(args[2]) if len(args)>2 else 60.0
+    print(vxm.kill(block=_block_flag(args), timeout=timeout))
+
+def _cmd_clear(vxm,args):
+    timeout=float(args[2]) if len(args)>2 else 10.0
+    print(vxm.clear(block=_block_flag(args), timeout=timeout))
+
+def _cmd_pos(vxm,args):
+    m=int(args[1]) if len(args)>1 else 1
+    raw=vxm.position_raw(m); val=vxm.position_value(m)
+    print(f"Motor {m} pos raw='{raw}' parsed={val}")
+
+def _cmd_isbusy(vxm,args):
+    m=int(args[1]) if len(args)>1 else 1
+    interval=float(args[2]) if len(args)>2 else 0.2
+    print(vxm.is_busy(m, interval))
+
+def _cmd_scale(vxm,args):
+    vxm.set_scale(float(args[1])); print("scale set")
+
+def _cmd_timeout(vxm,args):
+    vxm.read_timeout=float(args[1])
+    if len(args)>2: vxm.write_timeout=float(args[2])
+    print(f"read_timeout={vxm.read_timeout} write_timeout={vxm.write_timeout}")
+
+def _cmd_monitor(vxm,args):
+    seconds=float(args[1]) if len(args)>1 else 5.0
+    end=time.monotonic()+seconds
+    try:
+        while (rem:=end-time.monotonic())>0:
+            # blocking read: returns on data or timeout, no poll sleep
+            data=vxm.read_raw(min(0.5,rem))
+            if data: print(data.decode(errors="ignore"),end="",flush=True)
+    except KeyboardInterrupt: pass
+    print()
+
+def _cmd_program(vxm,args):
+    with open(args[1]) as f:
+        cmds=[l.strip() for l in f if l.strip() and not l.strip().startswith("#")]
+    print(vxm.compile_program(cmds)); print(f"uploaded {len(cmds)} commands")
+
+def _cmd_runprog(vxm,args):
+    timeout=float(args[2]) if len(args)>2 else 600.0
+    print(vxm.run_program(block=not _noblock_flag(args), timeout=timeout))
+
+def _cmd_home(vxm,args):
+    m=int(args[1]); dir=args[2].lower() if len(args)>2 else "neg"
+    sp=int(args[3]) if len(args)>3 else 500
+    back=int(args[4]) if len(args)>4 else 200
+    vxm.home(m,dir,sp,back); print("homed")
+
+def _cmd_sleep(vxm,args):
+    # chunked so Ctrl-C lands promptly (Windows won't interrupt a long sleep)
+    end=time.monotonic()+float(args[1])
+    try:
+        while (rem:=end-time.monotonic())>0:
+            time.sleep(min(rem,0.1))
+    except KeyboardInterrupt: pass
+
+COMMANDS = {
+    "help": _cmd_help,
+    "ports": _cmd_ports,
+    "send": _cmd_send,
+    "batch": _cmd_batch,
+    "speed": _cmd_speed,
+    "accel": _cmd_accel,
+    "move": _cmd_move,
+    "move_mm": _cmd_move_mm,
+    "run": _cmd_run,
+    "stop": _cmd_stop,
+    "kill": _cmd_kill,
+    "clear": _cmd_clear,
+    "pos": _cmd_pos,
+    "isbusy": _cmd_isbusy,
+    "scale": _cmd_scale,
+    "timeout": _cmd_timeout,
+    "monitor": _cmd_monitor,
+    "program": _cmd_program,
+    "runprog": _cmd_runprog,
+    "home": _cmd_home,
+    "sleep": _cmd_sleep,
+}
+
 def repl(vxm:VXM):
+    # VXM's own reader thread keeps the port drained while we sit at the
+    # prompt, so no pump is needed here.
     print("✅ Connected. Type 'help'.")
+    session=None
+    if PromptSession:
+        words=sorted(COMMANDS)+["quit","exit"]
+        session=PromptSession(completer=WordCompleter(words, sentence=True))
     while True:
-        try: line=input(PROMPT)
+        try: line=session.prompt(PROMPT) if session else input(PROMPT)
         except (EOFError,KeyboardInterrupt): print(); break
         if not line.strip(): continue
-        try: args=shlex.split(line)
-        except ValueError as e: print("Parse error",e); continue
+        if '"' in line or "'" in line or "\\" in line:
+            try: args=shlex.split(line)
+            except ValueError as e: print("Parse error",e); continue
+        else:
+            args=line.split()  # no quoting/escapes: skip the full shlex lexer
         cmd=args[0].lower()
-        try:
-            if cmd in ("quit","exit"): break
-            elif cmd=="help":
-                print(HELP)
-            elif cmd=="ports":
-                for p in list_serial_ports(): print(p)
-            elif cmd=="send":
-                print(vxm.send(" ".join(args[1:])))
-            elif cmd=="speed":
-                print(vxm.set_speed(int(args[1]),int(args[2])))
-            elif cmd=="accel":
-                print(vxm.set_accel(int(args[1]),int(args[2])))
-            elif cmd=="move":
-                print(vxm.move_relative(int(args[1]),int(args[2])))
-            elif cmd=="move_mm":
-                print(vxm.move_mm(int(args[1]),float(args[2])))
-            elif cmd=="run":
-                noblock = (len(args)>1 and args[1].lower() in ("noblock","nb","no"))
-                timeout = float(args[2]) if len(args)>2 else 120.0
-                print(vxm.run(block=not noblock, timeout=timeout))
-            elif cmd=="stop":
-                block = (len(args)>1 and args[1].lower() in ("block","b","yes","y","true","1"))
-                timeout = float(args[2]) if len(args)>2 else 60.0
-                print(vxm.stop(block=block, timeout=timeout))
-            elif cmd=="kill":
-                block = (len(args)>1 and args[1].lower() in ("block","b","yes","y","true","1"))
-                timeout = float(args[2]) if len(args)>2 else 60.0
-                print(vxm.kill(block=block, timeout=timeout))
-            elif cmd=="clear":
-                block = (len(args)>1 and args[1].lower() in ("block","b","yes","y","true","1"))
-                timeout = float(args[2]) if len(args)>2 else 10.0
-                print(vxm.clear(block=block, timeout=timeout))
-            elif cmd=="pos":
-                m=int(args[1]) if len(args)>1 else 1
-                raw=vxm.position_raw(m); val=vxm.position_value(m)
-                print(f"Motor {m} pos raw='{raw}' parsed={val}")
-            elif cmd=="isbusy":
-                m=int(args[1]) if len(args)>1 else 1
-                interval=float(args[2]) if len(args)>2 else 0.2
-                print(vxm.is_busy(m, interval))
-            elif cmd=="scale":
-                vxm.set_scale(float(args[1])); print("scale set")
-            elif cmd=="home":
-                m=int(args[1]); dir=args[2].lower() if len(args)>2 else "neg"
-                sp=int(args[3]) if len(args)>3 else 500
-                back=int(args[4]) if len(args)>4 else 200
-                vxm.home(m,dir,sp,back); print("homed")
-            elif cmd=="sleep":
-                time.sleep(float(args[1]))
-            else: print("Unknown")
+        if cmd in ("quit","exit"): break
+        handler=COMMANDS.get(cmd)
+        if handler is None: print("Unknown"); continue
+        try: handler(vxm,args)
         except Exception as e: print("❌",e)
 
 def main():